@@ -1,21 +1,24 @@
+import numpy as np
 import streamlit as st
-import matplotlib.pyplot as plt
-from matplotlib.patches import Rectangle
-from dataclasses import dataclass
-from typing import List
+
+from wardrobe.drawing import (
+    render_download_png,
+    render_download_svg,
+    render_elevation_rgba,
+    render_isometric_rgba,
+)
 
 # ----------------------------
 # Page config
 # ----------------------------
 st.set_page_config(page_title="Wardrobe Designer", layout="wide")
 
-# ----------------------------
-# Data model
-# ----------------------------
-@dataclass
-class Bay:
-    width_mm: int
-    layout: str  # "Single" | "Drawer tower" | "Double"
+# Layout options hoisted once: the widget loop needs both the tuple and an
+# O(1) name->index lookup for the selectbox default.
+BAY_LAYOUT_OPTIONS = ("Single", "Drawer tower", "Double")
+BAY_LAYOUT_INDEX = {t: i for i, t in enumerate(BAY_LAYOUT_OPTIONS)}
+
+DEFAULT_BAY_WIDTH = 600
 
 # ----------------------------
 # Session state helpers (robust)
@@ -35,6 +38,11 @@ def _is_str_list(x, n=None) -> bool:
     return all(isinstance(v, str) for v in x)
 
 def ensure_state(num_bays: int, default_width: int):
+    # Cheap signature check first: once the lists have been validated for this
+    # bay count, skip the O(N) type scans on every subsequent rerun.
+    if st.session_state.get("_bay_state_sig") == num_bays:
+        return
+
     # Ensure bay widths list is valid
     bw = st.session_state.get("bay_widths")
     if not _is_int_list(bw, n=num_bays):
@@ -45,158 +53,41 @@ def ensure_state(num_bays: int, default_width: int):
     if not _is_str_list(bl, n=num_bays):
         st.session_state["bay_layouts"] = ["Single"] * num_bays
 
-def build_bays() -> List[Bay]:
-    return [Bay(width_mm=w, layout=layout)
-            for w, layout in zip(st.session_state["bay_widths"], st.session_state["bay_layouts"])]
+    st.session_state["_bay_state_sig"] = num_bays
 
-# ----------------------------
-# Drawing utilities
-# ----------------------------
-def draw_elevation(bays: List[Bay], height_mm: int, depth_mm: int, customer_view: bool):
+def _apply_bay_count():
     """
-    2D front elevation: bays drawn left-to-right with internals indicated.
-    customer_view=True removes "technical" lines and keeps it cleaner.
+    Form-submit callback: resize the bay lists to the submitted count,
+    keeping existing bays' edits instead of resetting to defaults. Widgets
+    inside a form can't carry their own on_change, so this hangs off the
+    submit button and runs once per submit rather than every rerun.
     """
-    total_width = sum(b.width_mm for b in bays)
-    # Scale figure size based on wardrobe size (inches-ish)
-    fig_w = max(6.5, min(16.0, total_width / 250))
-    fig_h = max(4.0, min(10.0, height_mm / 300))
-
-    fig, ax = plt.subplots(figsize=(fig_w, fig_h))
-
-    # Outer carcass
-    ax.add_patch(Rectangle((0, 0), total_width, height_mm, fill=False, linewidth=2))
-
-    # Vertical bay dividers + internals
-    x = 0
-    for idx, bay in enumerate(bays):
-        # Bay outline (optional inner box)
-        ax.add_patch(Rectangle((x, 0), bay.width_mm, height_mm, fill=False, linewidth=1.5))
-
-        # Divider line at right edge (except last)
-        if idx < len(bays) - 1:
-            ax.plot([x + bay.width_mm, x + bay.width_mm], [0, height_mm], linewidth=2)
-
-        # Internals
-        if bay.layout == "Drawer tower":
-            # Drawer tower centered, with drawers stacked
-            tower_w = int(bay.width_mm * 0.55)
-            tower_x = x + (bay.width_mm - tower_w) / 2
-            base_y = 0
-            tower_h = int(height_mm * 0.60)
-
-            ax.add_patch(Rectangle((tower_x, base_y), tower_w, tower_h, fill=False, linewidth=1.5))
-
-            # Draw 4-5 drawer fronts
-            drawer_count = 5
-            step = tower_h / drawer_count
-            for d in range(1, drawer_count):
-                y = base_y + d * step
-                ax.plot([tower_x, tower_x + tower_w], [y, y], linewidth=1)
-
-            # Optional top shelf line above tower
-            if not customer_view:
-                shelf_y = tower_h + int(height_mm * 0.05)
-                ax.plot([x + 40, x + bay.width_mm - 40], [shelf_y, shelf_y], linewidth=1)
-
-        elif bay.layout == "Double":
-            # Two hanging zones (no labels per request)
-            top_y = int(height_mm * 0.58)
-            mid_y = int(height_mm * 0.12)
-
-            # Suggest rails as thin lines
-            ax.plot([x + 40, x + bay.width_mm - 40], [top_y, top_y], linewidth=1.5)
-            ax.plot([x + 40, x + bay.width_mm - 40], [mid_y + int(height_mm * 0.20), mid_y + int(height_mm * 0.20)], linewidth=1.5)
-
-            # Optional small shelf line between zones (installer-ish)
-            if not customer_view:
-                split_y = int(height_mm * 0.50)
-                ax.plot([x + 40, x + bay.width_mm - 40], [split_y, split_y], linewidth=1)
-
-        else:
-            # "Single" (plain): just one rail line (no label)
-            rail_y = int(height_mm * 0.62)
-            ax.plot([x + 40, x + bay.width_mm - 40], [rail_y, rail_y], linewidth=1.5)
-
-            # Optional: a top shelf line for installer view
-            if not customer_view:
-                shelf_y = int(height_mm * 0.85)
-                ax.plot([x + 40, x + bay.width_mm - 40], [shelf_y, shelf_y], linewidth=1)
-
-        # Bay width annotation (installer view only)
-        if not customer_view:
-            ax.text(x + bay.width_mm / 2, -height_mm * 0.035, f"{bay.width_mm}mm",
-                    ha="center", va="top", fontsize=10)
-
-        x += bay.width_mm
-
-    # Customer view: remove axes, keep clean
-    ax.set_xlim(0, total_width)
-    ax.set_ylim(-height_mm * 0.08, height_mm)
-    ax.set_aspect("equal", adjustable="box")
-    ax.axis("off")
-
-    title = "Wardrobe (Customer View)" if customer_view else "Wardrobe (Installer View)"
-    ax.set_title(title, fontsize=14, pad=12)
-
-    return fig
-
-def draw_isometric(bays: List[Bay], height_mm: int, depth_mm: int, customer_view: bool):
+    n = int(st.session_state["num_bays"])
+    cur_w = st.session_state.get("bay_widths") or []
+    cur_l = st.session_state.get("bay_layouts") or []
+    st.session_state["bay_widths"] = (list(cur_w) + [DEFAULT_BAY_WIDTH] * n)[:n]
+    st.session_state["bay_layouts"] = (list(cur_l) + ["Single"] * n)[:n]
+    st.session_state["_bay_state_sig"] = n
+
+# Cached: the same (total, bays) pair comes back on every rerun, so the
+# arange/full allocations only happen when the inputs actually change.
+# st.cache_data hands back a copy, so the session-state list stays mutable.
+@st.cache_data(max_entries=128)
+def split_widths(total_w_mm: int, num_bays: int, custom: tuple | None = None) -> list:
     """
-    Fake-3D isometric: front face + top/depth offset.
-    Still matplotlib, so it stays simple and fast.
+    Distribute total_w_mm over num_bays in whole millimetres, branchlessly:
+    equal split with the remainder spread over the leftmost bays, or a
+    proportional rescale of `custom` widths when given.
     """
-    total_width = sum(b.width_mm for b in bays)
-
-    # Isometric offsets (in mm units for drawing)
-    dx = int(depth_mm * 0.55)
-    dy = int(depth_mm * 0.30)
-
-    fig_w = max(7.0, min(16.0, (total_width + dx) / 260))
-    fig_h = max(4.5, min(10.0, (height_mm + dy) / 320))
-    fig, ax = plt.subplots(figsize=(fig_w, fig_h))
-
-    # Front rectangle
-    ax.add_patch(Rectangle((0, 0), total_width, height_mm, fill=False, linewidth=2))
-
-    # "Top" outline (shifted)
-    ax.plot([0, dx, total_width + dx, total_width, 0],
-            [height_mm, height_mm + dy, height_mm + dy, height_mm, height_mm],
-            linewidth=2)
-
-    # Side outline
-    ax.plot([total_width, total_width + dx],
-            [0, dy],
-            linewidth=2)
-    ax.plot([total_width + dx, total_width + dx],
-            [dy, height_mm + dy],
-            linewidth=2)
-
-    # Bay dividers on front + top
-    x = 0
-    for i, bay in enumerate(bays[:-1]):
-        x += bay.width_mm
-        ax.plot([x, x], [0, height_mm], linewidth=1.5)
-        ax.plot([x, x + dx], [height_mm, height_mm + dy], linewidth=1.5)
-
-    # Light internal hints (customer view = less busy)
-    if not customer_view:
-        x = 0
-        for bay in bays:
-            # show one internal line per bay
-            ax.plot([x + 40, x + bay.width_mm - 40], [int(height_mm * 0.75), int(height_mm * 0.75)], linewidth=1)
-            x += bay.width_mm
-
-    ax.set_aspect("equal", adjustable="box")
-    ax.axis("off")
-
-    title = "Isometric (Customer View)" if customer_view else "Isometric (Installer View)"
-    ax.set_title(title, fontsize=14, pad=12)
-
-    ax.set_xlim(-depth_mm * 0.1, total_width + dx + depth_mm * 0.2)
-    ax.set_ylim(-height_mm * 0.05, height_mm + dy + height_mm * 0.1)
-
-    return fig
+    if custom:
+        scaled = np.asarray(custom, dtype=np.float64)
+        scaled *= total_w_mm / scaled.sum()
+        rounded = np.floor(scaled).astype(np.int64)
+        # After floor the shortfall is always 0 <= diff < num_bays
+        rounded[: total_w_mm - rounded.sum()] += 1
+        return rounded.tolist()
+    base = np.full(num_bays, total_w_mm // num_bays, dtype=np.int64)
+    return (base + (np.arange(num_bays) < total_w_mm % num_bays)).tolist()
 
 # ----------------------------
 # UI
@@ -205,81 +96,138 @@ st.title("Wardrobe Designer")
 
 with st.sidebar:
     st.header("Wardrobe")
-    total_height = st.number_input("Height (mm)", min_value=1800, max_value=3000, value=2400, step=10)
-    depth = st.number_input("Depth (mm)", min_value=400, max_value=800, value=600, step=10)
+    # One form submit = one rerun, instead of a full render per keystroke
+    # while someone types "2400" into a number box.
+    with st.form("wardrobe_form", border=False):
+        total_height = st.number_input("Height (mm)", min_value=1800, max_value=3000, value=2400, step=10)
+        depth = st.number_input("Depth (mm)", min_value=400, max_value=800, value=600, step=10)
 
-    st.divider()
-    num_bays = st.number_input("Number of bays", min_value=1, max_value=8, value=4, step=1)
+        st.divider()
+        num_bays = st.number_input("Number of bays", min_value=1, max_value=8, value=4, step=1,
+                                   key="num_bays")
 
-    st.divider()
-    view_mode = st.radio("View mode", ["Customer view", "Installer view"], index=0)
-    customer_view = (view_mode == "Customer view")
+        st.divider()
+        view_mode = st.radio("View mode", ["Customer view", "Installer view"], index=0)
 
-    show_isometric = st.checkbox("Show fake-3D isometric", value=False)
+        show_isometric = st.checkbox("Show fake-3D isometric", value=False)
 
-    st.divider()
-    equal_widths = st.checkbox("Keep bays equal width", value=True)
+        st.divider()
+        equal_widths = st.checkbox("Keep bays equal width", value=True)
+
+        st.form_submit_button("Update preview", on_click=_apply_bay_count)
 
-# Setup state safely
-default_bay_width = 600
-ensure_state(int(num_bays), default_bay_width)
+    customer_view = (view_mode == "Customer view")
+
+# Setup state safely (first run; afterwards the signature check is O(1) and
+# bay-count changes are handled by the submit callback)
+ensure_state(int(num_bays), DEFAULT_BAY_WIDTH)
 
 # Layout editors
 st.subheader("Bay setup")
 
-# If equal widths, expose one control and apply to all
+# If equal widths, expose one total-width control and split it over the bays
 if equal_widths:
-    w = st.number_input("Bay width (mm)", min_value=300, max_value=1200,
-                        value=int(st.session_state["bay_widths"][0]), step=10)
-    st.session_state["bay_widths"] = [int(w)] * int(num_bays)
-
-cols = st.columns(int(num_bays))
-layouts = ["Single", "Drawer tower", "Double"]
-
-for i in range(int(num_bays)):
-    with cols[i]:
-        st.markdown(f"**Bay {i+1}**")
-        if not equal_widths:
-            st.session_state["bay_widths"][i] = int(st.number_input(
-                "Width (mm)", min_value=300, max_value=1200,
-                value=int(st.session_state["bay_widths"][i]), step=10, key=f"w_{i}"
-            ))
-        st.session_state["bay_layouts"][i] = st.selectbox(
-            "Internal", layouts,
-            index=layouts.index(st.session_state["bay_layouts"][i]) if st.session_state["bay_layouts"][i] in layouts else 0,
-            key=f"layout_{i}"
-        )
-
-bays = build_bays()
+    total_w = st.number_input("Total width (mm)",
+                              min_value=300 * int(num_bays),
+                              max_value=1200 * int(num_bays),
+                              value=int(sum(st.session_state["bay_widths"])), step=10)
+    st.session_state["bay_widths"] = split_widths(int(total_w), int(num_bays))
+
+n = int(num_bays)
+cols = st.columns(n)
+
+# Widgets per bay, built as whole lists (comprehensions instead of
+# append-in-a-loop). Each column renders its children in call order, so the
+# header / width / layout stacking per bay is unchanged.
+for i, col in enumerate(cols):
+    col.markdown(f"**Bay {i+1}**")
+
+if not equal_widths:
+    st.session_state["bay_widths"] = [
+        int(cols[i].number_input(
+            "Width (mm)", min_value=300, max_value=1200,
+            value=int(st.session_state["bay_widths"][i]), step=10, key=f"w_{i}"
+        ))
+        for i in range(n)
+    ]
+
+st.session_state["bay_layouts"] = [
+    cols[i].selectbox(
+        "Internal", BAY_LAYOUT_OPTIONS,
+        index=BAY_LAYOUT_INDEX.get(st.session_state["bay_layouts"][i], 0),
+        key=f"layout_{i}"
+    )
+    for i in range(n)
+]
 
 # Render outputs
 st.divider()
 left, right = st.columns([2, 1], vertical_alignment="top")
 
-with left:
+# Fragment: preview reruns are scoped to this block instead of the whole
+# script, and most of them land on the render cache anyway.
+@st.fragment
+def render_preview(height_mm: int, depth_mm: int, customer_view: bool, show_isometric: bool):
     st.subheader("Design preview")
-    fig = draw_elevation(bays=bays, height_mm=int(total_height), depth_mm=int(depth), customer_view=customer_view)
-    st.pyplot(fig, clear_figure=True)
+    bay_widths = tuple(st.session_state["bay_widths"])
+    bay_layouts = tuple(st.session_state["bay_layouts"])
+
+    # Cheapest check first: if the plot inputs are identical to the previous
+    # rerun (the usual "an unrelated widget reran the script" case), reuse the
+    # last raster from session state without even hashing a cache key.
+    sig = (bay_widths, bay_layouts, height_mm, depth_mm, customer_view)
+    if sig != st.session_state.get("_last_plot_sig"):
+        st.session_state["_last_rgba"] = render_elevation_rgba(
+            bay_widths, bay_layouts, height_mm, depth_mm, customer_view)
+        st.session_state["_last_plot_sig"] = sig
+    # Fixed pixel width: a stable-size raster the frontend never rescales,
+    # and the render cache key stays independent of the container size.
+    st.image(st.session_state["_last_rgba"], width=720)
 
     if show_isometric:
-        fig_iso = draw_isometric(bays=bays, height_mm=int(total_height), depth_mm=int(depth), customer_view=customer_view)
-        st.pyplot(fig_iso, clear_figure=True)
+        rgba_iso = render_isometric_rgba(bay_widths, height_mm, depth_mm, customer_view)
+        st.image(rgba_iso, width=720)
+
+    # Exports are lazy: nothing is encoded until the user asks for it.
+    # SVG is the cheap one (no rasterization) and scales cleanly; PNG stays
+    # for anywhere that wants a plain raster.
+    if st.button("Generate export"):
+        with st.spinner("Rendering export..."):
+            svg = render_download_svg(bay_widths, bay_layouts,
+                                      height_mm, depth_mm, customer_view)
+            png = render_download_png(bay_widths, bay_layouts,
+                                      height_mm, depth_mm, customer_view)
+        st.download_button("Download SVG", svg, file_name="wardrobe.svg", mime="image/svg+xml")
+        st.download_button("Download PNG", png, file_name="wardrobe.png", mime="image/png")
 
-with right:
+with left:
+    render_preview(int(total_height), int(depth), customer_view, show_isometric)
+
+# Same treatment as the preview: summary reruns stay scoped to this block
+@st.fragment
+def render_summary(height_mm: int, depth_mm: int):
     st.subheader("Summary")
-    st.write(f"**Total width:** {sum(b.width_mm for b in bays)} mm")
-    st.write(f"**Height:** {int(total_height)} mm")
-    st.write(f"**Depth:** {int(depth)} mm")
+    st.write(f"**Total width:** {sum(st.session_state['bay_widths'])} mm")
+    st.write(f"**Height:** {height_mm} mm")
+    st.write(f"**Depth:** {depth_mm} mm")
 
     st.divider()
-    st.write("**Bays:**")
-    for idx, bay in enumerate(bays, start=1):
-        st.write(f"- Bay {idx}: {bay.width_mm} mm — {bay.layout}")
+    # One markdown element for all rows: each st.write is its own message to
+    # the frontend, so N bays would otherwise cost N roundtrips.
+    bay_lines = "\n".join(
+        f"- Bay {idx}: {w} mm — {layout}"
+        for idx, (w, layout) in enumerate(zip(st.session_state["bay_widths"],
+                                              st.session_state["bay_layouts"]), start=1))
+    st.markdown(f"**Bays:**\n{bay_lines}")
+
+with right:
+    render_summary(int(total_height), int(depth))
 
     st.divider()
     if st.button("Reset designer"):
         # Clear only our keys
-        for k in ["bay_widths", "bay_layouts"]:
+        for k in ["bay_widths", "bay_layouts", "_bay_state_sig",
+                  "_last_plot_sig", "_last_rgba"]:
             if k in st.session_state:
                 del st.session_state[k]
         st.rerun()
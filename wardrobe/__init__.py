@@ -0,0 +1,9 @@
+"""Shared drawing code for the Wardrobe Designer pages."""
+import matplotlib
+
+# Select the raster backend before pyplot is ever imported: everything renders
+# through st.image as raster output, so the interactive-backend autodetect is
+# wasted time. Doing it here means the matplotlib singleton setup runs once
+# per process no matter how many pages import the drawing module.
+matplotlib.use("agg", force=True)
+matplotlib.rcParams["figure.max_open_warning"] = 0
@@ -0,0 +1,328 @@
+"""Matplotlib drawing + cached rendering for the wardrobe preview.
+
+Pages stay thin UI wrappers; everything figure-related lives here so the
+matplotlib bootstrap (and the shared figure/caches) exist once per process.
+"""
+import io
+
+import streamlit as st
+import matplotlib.pyplot as plt
+import numpy as np
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.collections import LineCollection, PatchCollection, PolyCollection
+from matplotlib.figure import Figure
+from matplotlib.patches import Rectangle
+
+# The package __init__ selects the backend before pyplot is imported
+assert plt.get_backend().lower() == "agg"
+
+# ----------------------------
+# Drawing utilities
+# ----------------------------
+# Shared patch styles, parsed once instead of per-Rectangle kwargs
+_OUTLINE_KW = {"fill": False, "linewidth": 2}
+_INNER_KW = {"fill": False, "linewidth": 1.5}
+
+# One Figure/Axes reused for every render: plt.subplots allocates the figure,
+# canvas and full tick machinery each call, which is pure overhead when the
+# axes are cleared and redrawn anyway. Built outside pyplot so Streamlit's
+# end-of-run plt.close("all") cannot tear the shared canvas down. Reruns are
+# single-threaded per session, so sharing the resource is safe.
+@st.cache_resource
+def _shared_fig():
+    # dpi=120 with the ~10" longest edge gives a stable ~1200px raster, which
+    # the pages display at a fixed pixel width (no browser-side rescaling).
+    fig = Figure(figsize=(10, 6), dpi=120)
+    FigureCanvasAgg(fig)
+    return fig, fig.add_subplot()
+
+@st.cache_data(max_entries=64)
+def _carcass_geometry(bay_widths: tuple, height_mm: int):
+    """
+    Static carcass geometry: outer box, per-bay boxes and divider lines.
+    Depends only on widths/height, not on bay internals, so it is cached and
+    reused while the user flips layout selectboxes.
+    """
+    widths = np.asarray(bay_widths, dtype=np.float64)
+    xs = np.empty(len(widths) + 1)
+    xs[0] = 0
+    np.cumsum(widths, out=xs[1:])
+    total_width = xs[-1]
+
+    rects = [(0, 0, total_width, height_mm, 2)]  # (x, y, w, h, linewidth)
+    rects += [(x, 0, w, height_mm, 1.5) for x, w in zip(xs[:-1], widths)]
+    dividers = [((x, 0), (x, height_mm)) for x in xs[1:-1]]
+    return rects, dividers
+
+# Per-layout internals, dispatched via LAYOUT_DRAWERS instead of an if/elif
+# chain of string compares in the bay loop. Each drawer appends segments via
+# the seg callback and boxes onto rects.
+def _draw_tower(x, bw, height_mm, customer_view, seg, rects):
+    # Drawer tower centered, with drawers stacked
+    tower_w = int(bw * 0.55)
+    tower_x = x + (bw - tower_w) / 2
+    base_y = 0
+    tower_h = int(height_mm * 0.60)
+
+    rects.append(Rectangle((tower_x, base_y), tower_w, tower_h, **_INNER_KW))
+
+    # Drawer fronts at even steps - direct arithmetic, no linspace allocation
+    # for the sake of 4 interior points
+    drawer_count = 5
+    step = tower_h / drawer_count
+    for d in range(1, drawer_count):
+        y = base_y + d * step
+        seg(tower_x, y, tower_x + tower_w, y, 1)
+
+    # Optional top shelf line above tower
+    if not customer_view:
+        shelf_y = tower_h + int(height_mm * 0.05)
+        seg(x + 40, shelf_y, x + bw - 40, shelf_y, 1)
+
+def _draw_double(x, bw, height_mm, customer_view, seg, rects):
+    # Two hanging zones (no labels per request)
+    top_y = int(height_mm * 0.58)
+    mid_y = int(height_mm * 0.12)
+
+    # Suggest rails as thin lines
+    seg(x + 40, top_y, x + bw - 40, top_y, 1.5)
+    low_y = mid_y + int(height_mm * 0.20)
+    seg(x + 40, low_y, x + bw - 40, low_y, 1.5)
+
+    # Optional small shelf line between zones (installer-ish)
+    if not customer_view:
+        split_y = int(height_mm * 0.50)
+        seg(x + 40, split_y, x + bw - 40, split_y, 1)
+
+def _draw_single(x, bw, height_mm, customer_view, seg, rects):
+    # "Single" (plain): just one rail line (no label)
+    rail_y = int(height_mm * 0.62)
+    seg(x + 40, rail_y, x + bw - 40, rail_y, 1.5)
+
+    # Optional: a top shelf line for installer view
+    if not customer_view:
+        shelf_y = int(height_mm * 0.85)
+        seg(x + 40, shelf_y, x + bw - 40, shelf_y, 1)
+
+# Layout strings live in session state (selectbox values); the draw loop works
+# on small int codes so dispatch is a tuple index, not string hashing.
+BAY_CODES = {"Single": 0, "Double": 1, "Drawer tower": 2}
+_CODE_DRAWERS = (_draw_single, _draw_double, _draw_tower)
+
+# String-keyed view of the same table, for callers that hold layout names
+LAYOUT_DRAWERS = {name: _CODE_DRAWERS[code] for name, code in BAY_CODES.items()}
+
+def draw_elevation(bay_widths: tuple, bay_layouts: tuple,
+                   height_mm: int, depth_mm: int, customer_view: bool):
+    """
+    2D front elevation: bays drawn left-to-right with internals indicated.
+    Bays come in as parallel width/layout sequences (the session-state shape),
+    so no per-bay objects are built. customer_view=True removes "technical"
+    lines and keeps it cleaner.
+    """
+    # All bay left edges in one cumsum; its last element is the total width,
+    # so the widths are only traversed once.
+    widths = np.asarray(bay_widths, dtype=np.float64)
+    xs = np.empty(len(widths) + 1)
+    xs[0] = 0
+    np.cumsum(widths, out=xs[1:])
+    total_width = xs[-1]
+
+    # Size the figure so pixel aspect matches data aspect (longest edge ~10"),
+    # which lets us skip the set_aspect("equal") layout solve at draw time.
+    span_w = total_width
+    span_h = height_mm * 1.08  # data range includes the annotation strip below 0
+    scale = max(span_w, span_h) / 10.0
+
+    fig, ax = _shared_fig()
+    ax.clear()
+    fig.set_size_inches(span_w / scale, span_h / scale, forward=False)
+
+    # Batch everything: one PatchCollection for the boxes and one
+    # LineCollection for dividers/rails/drawer fronts, instead of one Artist
+    # per call. N python Artists -> 2 collections backed by arrays.
+    carcass_rects, dividers = _carcass_geometry(tuple(bay_widths), height_mm)
+    rects = [Rectangle((rx, ry), rw, rh, **(_OUTLINE_KW if lw == 2 else _INNER_KW))
+             for rx, ry, rw, rh, lw in carcass_rects]
+    segments = list(dividers)  # list of ((x0, y0), (x1, y1)) pairs
+    seg_widths = [2] * len(dividers)
+
+    def _seg(x0, y0, x1, y1, lw):
+        segments.append(((x0, y0), (x1, y1)))
+        seg_widths.append(lw)
+
+    # Encode layouts once (unknown strings fall back to the plain single rail)
+    codes = [BAY_CODES.get(layout, 0) for layout in bay_layouts]
+
+    # Level of detail: a bay narrower than ~2 rendered pixels collapses its
+    # rails and drawer fronts into the dividers anyway, so skip its internals
+    # entirely (the carcass box and dividers above still mark the bay).
+    px_per_mm = fig.get_size_inches()[0] * fig.dpi / total_width
+
+    for idx, (bw, code) in enumerate(zip(bay_widths, codes)):
+        x = xs[idx]
+        # Internals
+        if bw * px_per_mm >= 2:
+            _CODE_DRAWERS[code](x, bw, height_mm, customer_view, _seg, rects)
+
+        # Bay width annotation (installer view only)
+        if not customer_view:
+            ax.text(x + bw / 2, -height_mm * 0.035, f"{bw}mm",
+                    ha="center", va="top", fontsize=10)
+
+    ax.add_collection(PatchCollection(rects, match_original=True))
+    if segments:
+        ax.add_collection(LineCollection(np.asarray(segments), linewidths=seg_widths, colors="k"))
+
+    # Customer view: remove axes, keep clean
+    ax.set_xlim(0, total_width)
+    ax.set_ylim(-height_mm * 0.08, height_mm)
+    ax.set_aspect("auto")
+    ax.axis("off")
+
+    title = "Wardrobe (Customer View)" if customer_view else "Wardrobe (Installer View)"
+    ax.set_title(title, fontsize=14, pad=12)
+
+    return fig
+
+def draw_isometric(bay_widths: tuple, height_mm: int, depth_mm: int, customer_view: bool):
+    """
+    Fake-3D isometric: front face + top/depth offset.
+    Layouts don't show at this scale, so only the widths come in.
+    Still matplotlib, so it stays simple and fast.
+    """
+    # One cumsum gives bay boundaries and (last element) the total width
+    widths = np.asarray(bay_widths, dtype=np.float64)
+    xs = np.empty(len(widths) + 1)
+    xs[0] = 0
+    np.cumsum(widths, out=xs[1:])
+    total_width = xs[-1]
+
+    # Isometric offsets (in mm units for drawing)
+    dx = int(depth_mm * 0.55)
+    dy = int(depth_mm * 0.30)
+
+    # Same trick as draw_elevation: bake the data aspect into the figure size
+    # instead of paying for set_aspect("equal") at draw time.
+    span_w = total_width + dx + depth_mm * 0.3  # matches the xlim padding below
+    span_h = height_mm * 1.15 + dy
+    scale = max(span_w, span_h) / 10.0
+    fig, ax = _shared_fig()
+    ax.clear()
+    fig.set_size_inches(span_w / scale, span_h / scale, forward=False)
+
+    # Front rectangle
+    ax.add_patch(Rectangle((0, 0), total_width, height_mm, **_OUTLINE_KW))
+
+    # Batch every line (top/side outlines, dividers, hints) into one
+    # LineCollection rather than one ax.plot Artist per segment.
+    segments = []
+    seg_widths = []
+
+    def _seg(x0, y0, x1, y1, lw):
+        segments.append(((x0, y0), (x1, y1)))
+        seg_widths.append(lw)
+
+    # Top and side faces: two closed quads in a single PolyCollection instead
+    # of five loose outline segments (one Artist either way, but the closed
+    # faces make occlusion/fill changes a one-liner later).
+    faces = [
+        [(0, height_mm), (dx, height_mm + dy),
+         (total_width + dx, height_mm + dy), (total_width, height_mm)],
+        [(total_width, 0), (total_width, height_mm),
+         (total_width + dx, height_mm + dy), (total_width + dx, dy)],
+    ]
+    ax.add_collection(PolyCollection(faces, facecolors="none",
+                                     edgecolors="k", linewidths=2))
+
+    # Bay dividers on front + top: one stacked array for all boundaries
+    # (front verticals, then their echoes across the top face)
+    n_div = len(xs) - 2
+    if n_div > 0:
+        bx = xs[1:-1]
+        h = np.full(n_div, float(height_mm))
+        front = np.stack([np.column_stack([bx, np.zeros(n_div)]),
+                          np.column_stack([bx, h])], axis=1)
+        top_echo = np.stack([np.column_stack([bx, h]),
+                             np.column_stack([bx + dx, h + dy])], axis=1)
+        segments.extend(np.concatenate([front, top_echo]))
+        seg_widths.extend([1.5] * (2 * n_div))
+
+    # Light internal hints (customer view = less busy)
+    if not customer_view:
+        hint_y = int(height_mm * 0.75)
+        for left, right in zip(xs[:-1], xs[1:]):
+            # show one internal line per bay
+            _seg(left + 40, hint_y, right - 40, hint_y, 1)
+
+    ax.add_collection(LineCollection(np.asarray(segments), linewidths=seg_widths, colors="k"))
+
+    ax.set_aspect("auto")
+    ax.axis("off")
+
+    title = "Isometric (Customer View)" if customer_view else "Isometric (Installer View)"
+    ax.set_title(title, fontsize=14, pad=12)
+
+    ax.set_xlim(-depth_mm * 0.1, total_width + dx + depth_mm * 0.2)
+    ax.set_ylim(-height_mm * 0.05, height_mm + dy + height_mm * 0.1)
+
+    return fig
+
+# ----------------------------
+# Cached rendering
+# ----------------------------
+# Rebuilding the whole Figure on every rerun is the dominant cost of a slider
+# tweak, so cache the finished raster keyed on the primitive inputs: revisiting
+# a previous configuration becomes a dict lookup with no matplotlib work at all.
+# The preview stays raw RGBA straight off the Agg canvas - skipping PNG
+# DEFLATE, which would otherwise dominate once drawing itself is batched.
+def _rasterize(fig) -> np.ndarray:
+    # Copy the buffer: the shared figure's canvas gets redrawn on the next call.
+    fig.canvas.draw()
+    w, h = fig.canvas.get_width_height()
+    return np.frombuffer(fig.canvas.buffer_rgba(), dtype=np.uint8).reshape(h, w, 4).copy()
+
+@st.cache_data(max_entries=64, show_spinner=False)
+def render_elevation_rgba(bay_widths: tuple, bay_layouts: tuple,
+                          height_mm: int, depth_mm: int, customer_view: bool) -> np.ndarray:
+    fig = draw_elevation(bay_widths, bay_layouts, height_mm=height_mm,
+                         depth_mm=depth_mm, customer_view=customer_view)
+    return _rasterize(fig)
+
+# One reusable encode buffer instead of a fresh BytesIO per export
+@st.cache_resource
+def _png_buf() -> io.BytesIO:
+    return io.BytesIO()
+
+# PNG is only encoded when the user asks for a file: dpi=120 is plenty for
+# schematic line art and the axes already fill the figure, so no
+# bbox_inches="tight" layout pass either.
+@st.cache_data(max_entries=16)
+def render_download_png(bay_widths: tuple, bay_layouts: tuple,
+                        height_mm: int, depth_mm: int, customer_view: bool) -> bytes:
+    fig = draw_elevation(bay_widths, bay_layouts, height_mm=height_mm,
+                         depth_mm=depth_mm, customer_view=customer_view)
+    buf = _png_buf()
+    buf.seek(0)
+    buf.truncate()
+    fig.savefig(buf, format="png", dpi=120)
+    return buf.getvalue()
+
+# SVG export: the elevation is pure lines and rectangles, so the vector file
+# skips Agg rasterization entirely, stays small, and zooms cleanly.
+@st.cache_data(max_entries=16)
+def render_download_svg(bay_widths: tuple, bay_layouts: tuple,
+                        height_mm: int, depth_mm: int, customer_view: bool) -> bytes:
+    fig = draw_elevation(bay_widths, bay_layouts, height_mm=height_mm,
+                         depth_mm=depth_mm, customer_view=customer_view)
+    buf = io.StringIO()
+    fig.savefig(buf, format="svg")
+    return buf.getvalue().encode("utf-8")
+
+# Keyed on widths only: bay internals are invisible at isometric scale
+@st.cache_data(max_entries=64, show_spinner=False)
+def render_isometric_rgba(bay_widths: tuple, height_mm: int, depth_mm: int,
+                          customer_view: bool) -> np.ndarray:
+    fig = draw_isometric(bay_widths, height_mm=height_mm,
+                         depth_mm=depth_mm, customer_view=customer_view)
+    return _rasterize(fig)